@@ -1,3 +1,221 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+import time
+import wave
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from processing.admission import AdmissionController, ServidorOcupado
+from processing.hrv import METRICS, compute_hrv, compute_hrv_batch, filter_ectopic
+from . import views
+
+
+def wav_bytes(n_frames, sample_rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(np.zeros(n_frames, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+class Holder:
+    # Mantiene un trabajo admitido en un hilo aparte hasta llamar a release()
+
+    def __init__(self, controller, cost):
+        self._admitted = threading.Event()
+        self._done     = threading.Event()
+        self._thread   = threading.Thread(target=self._run, args=(controller, cost))
+        self._thread.start()
+        if not self._admitted.wait(2.0):
+            raise AssertionError(f"El trabajo de costo {cost} no fue admitido")
+
+    def _run(self, controller, cost):
+        with controller.admit(cost):
+            self._admitted.set()
+            self._done.wait()
+
+    def release(self):
+        self._done.set()
+        self._thread.join()
+
+
+def start_job(controller, cost, outcome):
+    # Lanza un trabajo en otro hilo y registra su resultado en outcome
+    def job():
+        try:
+            with controller.admit(cost):
+                outcome.append(cost)
+        except ServidorOcupado:
+            outcome.append(('503', cost))
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    # Margen para que el hilo llegue a la cola antes del siguiente paso
+    time.sleep(0.1)
+    return thread
+
+
+class AdmissionControllerTests(SimpleTestCase):
+
+    def test_cheaper_job_admitted_first(self):
+        controller = AdmissionController(max_samples=100, timeout=5.0)
+        holder  = Holder(controller, 90)
+        outcome = []
+
+        expensive = start_job(controller, 90, outcome)
+        cheap     = start_job(controller, 20, outcome)
+        self.assertEqual(outcome, [])
+
+        holder.release()
+        expensive.join()
+        cheap.join()
+
+        self.assertEqual(outcome, [20, 90])
+
+    def test_full_queue_rejects_immediately(self):
+        controller = AdmissionController(max_samples=100, timeout=5.0, max_queue=1)
+        holder  = Holder(controller, 100)
+        outcome = []
+        waiter  = start_job(controller, 50, outcome)
+
+        start = time.monotonic()
+        with self.assertRaises(ServidorOcupado):
+            with controller.admit(10):
+                pass
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        holder.release()
+        waiter.join()
+        self.assertEqual(outcome, [50])
+
+    def test_timed_out_waiter_does_not_block_next_job(self):
+        controller = AdmissionController(max_samples=100, timeout=0.1)
+        holder = Holder(controller, 100)
+
+        start = time.monotonic()
+        with self.assertRaises(ServidorOcupado):
+            with controller.admit(50):
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+        # Con el presupuesto libre, el siguiente trabajo entra aunque
+        # antes haya vencido otro en la cola
+        holder.release()
+        with controller.admit(100):
+            pass
+
+    def test_estimate_cost_reads_header(self):
+        with tempfile.NamedTemporaryFile(suffix='.wav') as tmp:
+            tmp.write(wav_bytes(1234))
+            tmp.flush()
+            self.assertEqual(AdmissionController().estimate_cost(tmp.name), 1234)
+
+
+class ProcessViewAdmissionTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def test_saturated_server_returns_503(self):
+        controller = AdmissionController(max_samples=100, max_queue=0, retry_after=7)
+        holder = Holder(controller, 100)
+        self.addCleanup(holder.release)
+        upload = SimpleUploadedFile('clip.wav', wav_bytes(800), content_type='audio/wav')
+
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(views, 'admission', controller):
+            response = self.client.post(reverse('process'), {'audio': upload})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(response.json()['status'], 'error')
+
+
+def modulated_rr(freq, n_beats=300, mean=0.8, amplitude=0.03):
+    # Serie RR con una modulación sinusoidal pura de frecuencia freq (Hz)
+    t = np.cumsum(np.full(n_beats, mean))
+    return mean + amplitude * np.sin(2 * np.pi * freq * t)
+
+
+class HrvTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_time_domain_matches_numpy(self):
+        rr = 0.8 + 0.02 * self.rng.standard_normal(200)
+        metrics = compute_hrv(rr, filter_beats=False)
+
+        self.assertAlmostEqual(metrics['sdnn'], np.std(rr))
+        self.assertAlmostEqual(metrics['rmssd'], np.sqrt(np.mean(np.diff(rr) ** 2)))
+        self.assertAlmostEqual(metrics['sdsd'], np.std(np.diff(rr)))
+        self.assertAlmostEqual(metrics['pnn50'], 100 * np.mean(np.abs(np.diff(rr)) > 0.05))
+
+    def test_pure_modulation_lands_in_its_band(self):
+        hf_rr = modulated_rr(0.25)
+        lf_rr = modulated_rr(0.10)
+        hf = compute_hrv(hf_rr)
+        lf = compute_hrv(lf_rr)
+
+        self.assertGreater(hf['hf'], 100 * hf['lf'])
+        self.assertGreater(lf['lf'], 100 * lf['hf'])
+
+        # La densidad espectral integrada recupera la varianza de la serie
+        self.assertAlmostEqual(hf['lf'] + hf['hf'], np.var(hf_rr), delta=0.05 * np.var(hf_rr))
+        self.assertAlmostEqual(lf['lf'] + lf['hf'], np.var(lf_rr), delta=0.05 * np.var(lf_rr))
+
+    def test_short_record_has_no_frequency_metrics(self):
+        metrics = compute_hrv(modulated_rr(0.10, n_beats=60))
+
+        self.assertFalse(np.isnan(metrics['sdnn']))
+        for name in ('lf', 'hf', 'lf_hf'):
+            self.assertTrue(np.isnan(metrics[name]), name)
+
+    def test_ectopic_filter_follows_heart_rate_changes(self):
+        rr = np.r_[np.full(150, 0.75), np.full(150, 1.2)]
+        rr = rr + 0.01 * self.rng.standard_normal(len(rr))
+        rr[60], rr[61] = 0.45, 1.05   # Latido prematuro con pausa compensatoria
+
+        filtered = filter_ectopic(rr)
+
+        self.assertEqual(filtered.shape, rr.shape)
+
+        self.assertEqual(list(np.flatnonzero(np.isnan(filtered))), [60, 61])
+
+    def test_batch_matches_single_recordings(self):
+        series = [modulated_rr(0.1, n) + 0.01 * self.rng.standard_normal(n)
+                  for n in (300, 0, 1, 200, 1000, 160)]
+        batch = compute_hrv_batch(series)
+
+        for i, rr in enumerate(series):
+            single = compute_hrv(rr)
+            for name in METRICS:
+                np.testing.assert_allclose(batch[name][i], single[name], equal_nan=True,
+                                           err_msg=f"serie {i}, {name}")
+
+    def test_batch_accepts_iterables_and_rejects_single_series(self):
+        series = [modulated_rr(0.1, n) for n in (300, 200)]
+        expected = compute_hrv_batch(series)
+
+        from_generator = compute_hrv_batch(rr for rr in series)
+        np.testing.assert_allclose(from_generator['sdnn'], expected['sdnn'])
+
+        with self.assertRaises(ValueError):
+            compute_hrv_batch(series[0])
+
+    def test_empty_and_single_beat_are_nan(self):
+        for rr in ([], [0.8]):
+            metrics = compute_hrv(rr)
+            for name in METRICS:
+                if name in ('mean_rr', 'n_valid'):
+                    continue
+                self.assertTrue(np.isnan(metrics[name]), f"{len(rr)} latidos, {name}")
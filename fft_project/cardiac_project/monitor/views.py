@@ -1,13 +1,27 @@
 from django.shortcuts import render, redirect
 from django.views import View, generic
 from django.core.files.storage import default_storage
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from processing.audio_processor import AudioProcessor
+from processing.admission import (
+    AdmissionController, ServidorOcupado,
+    MAX_INFLIGHT_SAMPLES, ADMISSION_TIMEOUT, MAX_QUEUE, RETRY_AFTER,
+)
 from . import forms
 import uuid
 import traceback
 
+# Control de admisión compartido por los hilos de este proceso; cada
+# worker tiene el suyo (ver MAX_INFLIGHT_SAMPLES en processing/admission.py)
+admission = AdmissionController(
+    max_samples=getattr(settings, 'ANALYSIS_MAX_INFLIGHT_SAMPLES', MAX_INFLIGHT_SAMPLES),
+    timeout=getattr(settings, 'ANALYSIS_ADMISSION_TIMEOUT', ADMISSION_TIMEOUT),
+    max_queue=getattr(settings, 'ANALYSIS_MAX_QUEUE', MAX_QUEUE),
+    retry_after=getattr(settings, 'ANALYSIS_RETRY_AFTER', RETRY_AFTER),
+)
+
 class IndexView(generic.TemplateView):
     template_name = "monitor/index.html"
 
@@ -34,7 +48,15 @@ class UploadView(generic.FormView):
         filename = default_storage.save(f"uploads/{audio_file.name}", audio_file)
         
         # Procesar y redirigir a resultados
-        result_id, error_message = run_analysis(filename, self.request)
+        try:
+            result_id, error_message = run_analysis(filename, self.request)
+        except ServidorOcupado as e:
+            response = render(self.request, "monitor/upload.html", {
+                "form": form,
+                "error": str(e)
+            }, status=503)
+            response['Retry-After'] = str(e.retry_after)
+            return response
         
         if not result_id:
             return render(self.request, "monitor/upload.html", {
@@ -82,7 +104,15 @@ def process_view(request):
     # Seccion para procesar audio (FFT, etc.)
     # Seccion para procesar audio
     if filename:
-        result_id, error_message = run_analysis(filename, request)
+        try:
+            result_id, error_message = run_analysis(filename, request)
+        except ServidorOcupado as e:
+            response = JsonResponse({
+                'status': 'error',
+                'message': str(e)
+            }, status=503)
+            response['Retry-After'] = str(e.retry_after)
+            return response
         
         if result_id:
             return JsonResponse({
@@ -119,12 +149,18 @@ def run_analysis(filename, request):
 
     try:
         file_path = default_storage.path(filename)
-        processor = AudioProcessor()
-        results   = processor.process_file(file_path)
+        cost      = admission.estimate_cost(file_path)
+
+        with admission.admit(cost):
+            processor = AudioProcessor()
+            results   = processor.process_file(file_path)
+
         result_id = uuid.uuid4().hex[:10]
         request.session[f'analysis_{result_id}'] = results
 
         return result_id, None
+    except ServidorOcupado:
+        raise
     except Exception as e:
             # Imprime el error completo en la consola negra para que lo veas
             print("\n" + "!"*30)
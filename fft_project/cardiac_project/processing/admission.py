@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import threading
+import time
+import wave
+from contextlib import contextmanager
+
+# Presupuesto de muestras en proceso (~10 min de audio a 44.1 kHz).
+# Es por proceso: el controlador vive en memoria, así que con N workers
+# (gunicorn, uWSGI, ...) el total del servidor es N x MAX_INFLIGHT_SAMPLES;
+# en ese caso conviene dividir el presupuesto entre los workers.
+MAX_INFLIGHT_SAMPLES = 44100 * 600
+# Tiempo máximo que un trabajo espera turno antes de rechazarse (s)
+ADMISSION_TIMEOUT = 2.0
+# Trabajos que pueden esperar a la vez antes de rechazar de inmediato
+MAX_QUEUE = 16
+# Valor sugerido al cliente en la cabecera Retry-After (s)
+RETRY_AFTER = 5
+
+
+class ServidorOcupado(Exception):
+
+    def __init__(self, retry_after=RETRY_AFTER):
+        super().__init__("Servidor ocupado, intente nuevamente más tarde")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+
+    def __init__(self, max_samples=MAX_INFLIGHT_SAMPLES, timeout=ADMISSION_TIMEOUT,
+                 max_queue=MAX_QUEUE, retry_after=RETRY_AFTER):
+        self.max_samples = max_samples
+        self.timeout     = timeout
+        self.max_queue   = max_queue
+        self.retry_after = retry_after
+
+        self._cond     = threading.Condition()
+        self._inflight = 0
+        self._waiting  = []
+        self._seq      = itertools.count()
+
+    def estimate_cost(self, file_path):
+
+        # Costo = muestras totales (frames x canales), leído de la cabecera
+        # sin decodificar audio; la frecuencia de muestreo no cambia el trabajo
+        # por muestra, así que no entra en la estimación
+        try:
+            with wave.open(file_path, 'rb') as wav_file:
+                return wav_file.getnframes() * wav_file.getnchannels()
+
+        except FileNotFoundError:
+            raise ValueError("Archivo no encontrado")
+        except Exception:
+            raise ValueError("Error al leer WAV")
+
+    @contextmanager
+    def admit(self, cost):
+        self._acquire(cost)
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def _fits(self, cost):
+        # Un trabajo mayor que el presupuesto solo entra con el servidor libre
+        return self._inflight == 0 or self._inflight + cost <= self.max_samples
+
+    def _acquire(self, cost):
+
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            # Camino rápido: nadie esperando y hay presupuesto
+            if not self._waiting and self._fits(cost):
+                self._inflight += cost
+                return
+
+            # Servidor saturado: rechazar sin hacer esperar al cliente
+            if len(self._waiting) >= self.max_queue:
+                raise ServidorOcupado(self.retry_after)
+
+            # Cola por costo: los audios cortos pasan antes que los largos
+            ticket = (cost, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+
+            try:
+                while not (self._waiting[0] == ticket and self._fits(cost)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ServidorOcupado(self.retry_after)
+                    self._cond.wait(remaining)
+
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._waiting)
+            self._inflight += cost
+
+            # El siguiente en la cola puede caber también
+            self._cond.notify_all()
+
+    def _release(self, cost):
+        with self._cond:
+            self._inflight -= cost
+            self._cond.notify_all()
@@ -158,11 +158,7 @@ class AudioProcessor:
             return 0.0, []
         
         # Calcular intervalos RR (en segundos)
-        rr_intervals = []
-        for i in range(len(peaks) - 1):
-            interval_samples = peaks[i + 1] - peaks[i]
-            interval_seconds = interval_samples / sample_rate
-            rr_intervals.append(interval_seconds)
+        rr_intervals = np.diff(peaks) / sample_rate
         
         # BPM promedio
         if len(rr_intervals) > 0:
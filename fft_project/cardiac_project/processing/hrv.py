@@ -0,0 +1,281 @@
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Filtro de latidos ectópicos
+ECTOPIC_TOL = 0.20      # Desviación máxima respecto a la mediana local (20%)
+ECTOPIC_WINDOW = 5      # Latidos de la mediana móvil (centrada)
+RR_MIN = 0.30           # Límites fisiológicos del intervalo RR (s)
+RR_MAX = 2.00
+
+# Dominio del tiempo
+NN50 = 0.050            # Umbral de pNN50 (50 ms)
+HIST_BIN = 1.0 / 128.0  # Ancho de barra del índice triangular (7.8125 ms)
+
+# Dominio de la frecuencia (Hz)
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+N_FREQS = 256
+MIN_BEATS_FREQ = 8
+MIN_DURATION_FREQ = 120.0   # Registro mínimo para LF/HF (s), estándar de 2 min
+
+# Límites de memoria (en elementos float64)
+STACK_ELEMS = 1 << 20   # Filas x latidos de cada grupo apilado
+CHUNK_ELEMS = 1 << 16   # Filas x latidos de cada bloque de Lomb–Scargle
+
+METRICS = ('mean_rr', 'sdnn', 'rmssd', 'sdsd', 'pnn50', 'tri_index',
+           'lf', 'hf', 'lf_hf', 'n_valid')
+
+
+def stack_rr(rr_series):
+
+    # Apila series RR de distinta longitud en una matriz rellenada con NaN
+    lengths = np.array([len(rr) for rr in rr_series], dtype=np.intp)
+    width   = int(lengths.max()) if len(lengths) else 0
+
+    stacked = np.full((len(lengths), width), np.nan)
+    mask    = np.arange(width) < lengths[:, None]
+    if width:
+        stacked[mask] = np.concatenate([np.asarray(rr, dtype=np.float64).ravel()
+                                        for rr in rr_series])
+
+    return stacked
+
+
+def filter_ectopic(rr, tol=ECTOPIC_TOL, window=ECTOPIC_WINDOW):
+
+    # Marca como NaN los latidos fuera de rango o alejados de la mediana de
+    # sus vecinos, así un cambio lento de frecuencia no descarta latidos.
+    # No compacta la serie: el eje de tiempo se conserva para Lomb–Scargle
+    # y las diferencias sucesivas a través de un hueco quedan en NaN.
+    # Acepta una serie (1-D) o una matriz de series y devuelve la misma forma
+    shape = np.shape(rr)
+    rr = np.array(rr, dtype=np.float64, ndmin=2)
+    rr[(rr < RR_MIN) | (rr > RR_MAX)] = np.nan
+    if rr.shape[1] == 0:
+        return rr.reshape(shape)
+
+    half   = window // 2
+    padded = np.pad(rr, ((0, 0), (half, window - 1 - half)), constant_values=np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        local = np.nanmedian(sliding_window_view(padded, window, axis=1), axis=-1)
+
+    rr[np.abs(rr - local) > tol * local] = np.nan
+
+    return rr.reshape(shape)
+
+
+def _masked_mean_std(values):
+
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=1)
+    filled = np.where(valid, values, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = filled.sum(axis=1) / count
+        dev  = np.where(valid, values - mean[:, None], 0.0)
+        std  = np.sqrt((dev ** 2).sum(axis=1) / count)
+
+    # Con un solo valor la dispersión no está definida
+    std[count < 2] = np.nan
+
+    return mean, std, count
+
+
+def _time_domain(rr):
+
+    mean_rr, sdnn, n_valid = _masked_mean_std(rr)
+
+    # Diferencias sucesivas (NaN si alguno de los dos latidos fue descartado)
+    diffs = np.diff(rr, axis=1)
+    diff_valid = ~np.isnan(diffs)
+    n_diffs    = diff_valid.sum(axis=1)
+    sq_diffs   = np.where(diff_valid, diffs ** 2, 0.0)
+    nn50       = (np.abs(np.where(diff_valid, diffs, 0.0)) > NN50).sum(axis=1)
+    _, sdsd, _ = _masked_mean_std(diffs)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rmssd = np.sqrt(sq_diffs.sum(axis=1) / n_diffs)
+        pnn50 = 100.0 * nn50 / n_diffs
+
+    # Índice triangular: latidos válidos / altura de la barra más alta.
+    # Se desplaza cada fila a su propio rango de barras para un solo bincount.
+    n_rows = rr.shape[0]
+    tri_index = np.full(n_rows, np.nan)
+    if rr.size and n_valid.any():
+        bins  = np.floor(np.where(np.isnan(rr), 0.0, rr) / HIST_BIN).astype(np.intp)
+        bins -= np.where(np.isnan(rr), bins.max() + 1, bins).min(axis=1, keepdims=True)
+        n_bins = int(bins.max()) + 1
+        rows, cols = np.nonzero(~np.isnan(rr))
+        counts = np.bincount(rows * n_bins + bins[rows, cols],
+                             minlength=n_rows * n_bins).reshape(n_rows, n_bins)
+        peak = counts.max(axis=1)
+        tri_index = np.where(n_valid >= 2, n_valid / np.maximum(peak, 1), np.nan)
+
+    return {
+        'mean_rr':   mean_rr,
+        'sdnn':      sdnn,
+        'rmssd':     rmssd,
+        'sdsd':      sdsd,
+        'pnn50':     pnn50,
+        'tri_index': tri_index,
+        'n_valid':   n_valid,
+    }
+
+
+def _lomb_scargle(t, x, freqs, duration):
+
+    # Periodograma de Lomb–Scargle sobre filas rellenadas con NaN.
+    # Trabaja con muestras irregulares: no se remuestrea a una malla uniforme.
+    # La malla de frecuencias es uniforme, así que sin(ωt) y cos(ωt) se
+    # obtienen rotando los de la frecuencia anterior (suma de ángulos) en vez
+    # de evaluar funciones trigonométricas por cada latido y frecuencia.
+    valid = ~np.isnan(x)
+    n     = valid.sum(axis=1)
+    w     = 2.0 * np.pi * freqs
+    dw    = w[1] - w[0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(valid, x - np.nansum(x, axis=1, keepdims=True) / n[:, None], 0.0)
+    t = np.where(valid, t, 0.0)
+
+    # Los latidos descartados quedan en cero y no aportan a ninguna suma
+    c  = np.cos(w[0] * t) * valid
+    s  = np.sin(w[0] * t) * valid
+    cd = np.cos(dw * t)
+    sd = np.sin(dw * t)
+
+    power = np.empty((x.shape[0], len(freqs)))
+    for k in range(len(freqs)):
+        if k:
+            c, s = c * cd - s * sd, s * cd + c * sd
+
+        xc = np.einsum('ij,ij->i', x, c)
+        xs = np.einsum('ij,ij->i', x, s)
+        cc = np.einsum('ij,ij->i', c, c)
+        ss = np.einsum('ij,ij->i', s, s)
+        cs = np.einsum('ij,ij->i', c, s)
+
+        # Desfase ωτ: tan(2ωτ) = Σ sin 2ωt / Σ cos 2ωt = 2Σcs / (Σc² - Σs²)
+        phase = 0.5 * np.arctan2(2.0 * cs, cc - ss)
+        cp, sp = np.cos(phase), np.sin(phase)
+
+        # Sumas sobre cos(ωt - ωτ) y sin(ωt - ωτ) expandidas por suma de ángulos
+        xcos = cp * xc + sp * xs
+        xsin = cp * xs - sp * xc
+        ccos = cp * cp * cc + 2.0 * cp * sp * cs + sp * sp * ss
+        csin = cp * cp * ss - 2.0 * cp * sp * cs + sp * sp * cc
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            power[:, k] = 0.5 * (xcos ** 2 / ccos + xsin ** 2 / csin)
+
+    # Escala a densidad espectral unilateral (s²/Hz)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return power * (2.0 * duration / n)[:, None]
+
+
+def _band_power(psd, freqs, band):
+    sel = (freqs >= band[0]) & (freqs <= band[1])
+    return np.trapezoid(psd[:, sel], freqs[sel], axis=1)
+
+
+def _frequency_domain(rr_raw, rr):
+
+    n_rows, width = rr.shape
+    freqs = np.linspace(LF_BAND[0], HF_BAND[1], N_FREQS)
+    lf = np.full(n_rows, np.nan)
+    hf = np.full(n_rows, np.nan)
+
+    # Tiempo de cada latido a partir de la serie original (incluye ectópicos)
+    t = np.cumsum(np.nan_to_num(rr_raw), axis=1)
+
+    # LF necesita al menos 2 min de registro para resolver 0.04 Hz
+    valid    = ~np.isnan(rr)
+    span     = np.where(valid, t, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        duration = np.nanmax(span, axis=1, initial=-np.inf) \
+            - np.nanmin(span, axis=1, initial=np.inf)
+    enough = (valid.sum(axis=1) >= MIN_BEATS_FREQ) & (duration >= MIN_DURATION_FREQ)
+    rows   = np.flatnonzero(enough)
+
+    # Filas por bloque: cada arreglo de trabajo tiene a lo sumo CHUNK_ELEMS
+    # elementos (o una sola fila si es más larga)
+    step = max(1, CHUNK_ELEMS // max(1, width))
+
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        # Recorta el relleno final que ninguna fila del bloque usa
+        last  = int(np.flatnonzero(valid[block].any(axis=0)).max()) + 1
+        psd   = _lomb_scargle(t[block, :last], rr[block, :last], freqs, duration[block])
+        lf[block] = _band_power(psd, freqs, LF_BAND)
+        hf[block] = _band_power(psd, freqs, HF_BAND)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lf_hf = lf / hf
+
+    return {'lf': lf, 'hf': hf, 'lf_hf': lf_hf}
+
+
+def _compute_stacked(rr_raw, filter_beats):
+
+    rr = filter_ectopic(rr_raw) if filter_beats else rr_raw.copy()
+
+    metrics = _time_domain(rr)
+    metrics.update(_frequency_domain(rr_raw, rr))
+
+    return metrics
+
+
+def _length_groups(lengths):
+
+    # Índices de filas ordenadas por longitud, agrupadas para que cada
+    # matriz apilada tenga a lo sumo STACK_ELEMS elementos (salvo una fila
+    # que por sí sola ya los supere)
+    order  = np.argsort(lengths, kind='stable')
+    groups = []
+    start  = 0
+    for end in range(1, len(order) + 1):
+        if end == len(order) or (end - start + 1) * lengths[order[end]] > STACK_ELEMS:
+            groups.append(order[start:end])
+            start = end
+
+    return groups
+
+
+def compute_hrv_batch(rr_series, filter_beats=True):
+
+    # Calcula todas las métricas para una cohorte de series RR (en segundos).
+    # Acepta una lista de series de distinta longitud o una matriz con NaN.
+    if isinstance(rr_series, np.ndarray):
+        if rr_series.ndim == 2:
+            return _compute_stacked(rr_series.astype(np.float64), filter_beats)
+        if rr_series.dtype != object:
+            raise ValueError("compute_hrv_batch espera varias series RR; "
+                             "para una sola grabación use compute_hrv")
+
+    rr_series = list(rr_series)
+
+    # Se agrupan series de longitud parecida para que una grabación larga
+    # no obligue a rellenar todas las demás hasta su tamaño
+    lengths = np.array([len(rr) for rr in rr_series], dtype=np.intp)
+    metrics = {name: np.full(len(lengths), np.nan) for name in METRICS}
+    metrics['n_valid'] = np.zeros(len(lengths), dtype=np.intp)
+
+    for group in _length_groups(lengths):
+        stacked = _compute_stacked(stack_rr([rr_series[i] for i in group]), filter_beats)
+        for name in METRICS:
+            metrics[name][group] = stacked[name]
+
+    return metrics
+
+
+def compute_hrv(rr_intervals, filter_beats=True):
+
+    # Métricas de una sola grabación como diccionario de floats
+    batch = compute_hrv_batch([np.asarray(rr_intervals, dtype=np.float64)],
+                              filter_beats=filter_beats)
+
+    return {name: float(batch[name][0]) for name in METRICS}